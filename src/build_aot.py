@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time build of the TTST numba kernels
+
+Compiles the solar and thermal kernels into the extension module
+_ttst_kernels next to this file. solar_rhythm and thermal_rhythm import
+it in preference to JIT compilation, so the kernels load instantly and
+no longer need numba at runtime. AOT kernels run serially (prange
+becomes range).
+
+Also compiles ttst_kernel.c into the shared library libttst_kernel,
+which ttst_simulation loads with ctypes in place of its numba kernel.
+Set CC to choose the C compiler (default: cc).
+
+Usage:
+    python build_aot.py
+
+Author: Tomoyuki Kano
+License: MIT
+"""
+
+import os
+import subprocess
+import sys
+import sysconfig
+from pathlib import Path
+
+# Build from the JIT definitions even if a previous build is importable
+sys.modules['_ttst_kernels'] = None
+
+from numba.pycc import CC
+
+import solar_rhythm
+import thermal_rhythm
+
+# (exported name, JIT dispatcher, signature)
+KERNELS = [
+    ('photoperiod_kernel', solar_rhythm._photoperiod_kernel,
+     'f8[:](f8[:], f8, f8, f8[:])'),
+    ('light_from_sin_kernel', solar_rhythm._light_from_sin_kernel,
+     'f8[:](f8[:], f8, f8[:])'),
+    ('cyanobacteria_kernel', solar_rhythm._cyanobacteria_kernel,
+     'void(f8[:], f8, f8, f8[:], f8[:], f8[:])'),
+    ('ar1', thermal_rhythm._ar1,
+     'f8[:](f8[:], f8, f8[:])'),
+    ('fuse_total', thermal_rhythm._fuse_total,
+     'f8(f8[:], f8[:], f8[:], f8[:], f8[:])'),
+    ('pressure_kernel', thermal_rhythm._pressure_kernel,
+     'f8[:](f8[:], f8, f8, f8, f8, f8[:])'),
+    ('convection_kernel', thermal_rhythm._convection_kernel,
+     'f8[:](f8[:], f8, f8, f8[:])'),
+]
+
+
+# Flags for the C rhythm kernel; -ffast-math lets GCC use libmvec's
+# vectorized sin/tanh inside the OpenMP simd loops
+C_FLAGS = ['-O3', '-march=native', '-ffast-math', '-fopenmp', '-fPIC', '-shared']
+
+
+def build_c_kernel():
+    """Compile ttst_kernel.c into libttst_kernel next to this file"""
+    here = Path(__file__).parent
+    suffix = '.dylib' if sys.platform == 'darwin' else '.so'
+    target = here / f'libttst_kernel{suffix}'
+
+    compiler = os.environ.get('CC') or sysconfig.get_config_var('CC') or 'cc'
+    command = (compiler.split() + C_FLAGS
+               + [str(here / 'ttst_kernel.c'), '-o', str(target), '-lm'])
+    subprocess.run(command, check=True)
+    print(f"Built {target.name} in {here}")
+
+
+def main():
+    """Compile the kernels into _ttst_kernels and libttst_kernel"""
+    cc = CC('_ttst_kernels')
+    cc.output_dir = str(Path(__file__).parent)
+
+    for name, dispatcher, signature in KERNELS:
+        cc.export(name, signature)(dispatcher.py_func)
+
+    cc.compile()
+    print(f"Built _ttst_kernels in {cc.output_dir}")
+
+    build_c_kernel()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ import matplotlib.patches as mpatches
 from matplotlib.gridspec import GridSpec
 import seaborn as sns
 from pathlib import Path
+import functools
+import hashlib
 import sys
 
 # Add parent directory to path for imports
@@ -24,17 +26,19 @@ from thermal_rhythm import ThermalRhythm
 from tidal_rhythm import TidalRhythm
 from solar_rhythm import SolarRhythm
 
-# Set style for publication
-plt.style.use('seaborn-v0_8-paper')
-sns.set_palette("husl")
-plt.rcParams['figure.dpi'] = 300
-plt.rcParams['savefig.dpi'] = 300
-plt.rcParams['font.size'] = 10
-plt.rcParams['axes.labelsize'] = 11
-plt.rcParams['axes.titlesize'] = 12
-plt.rcParams['xtick.labelsize'] = 10
-plt.rcParams['ytick.labelsize'] = 10
-plt.rcParams['legend.fontsize'] = 10
+
+def setup_style():
+    """Set style for publication"""
+    plt.style.use('seaborn-v0_8-paper')
+    sns.set_palette("husl")
+    plt.rcParams['figure.dpi'] = 300
+    plt.rcParams['savefig.dpi'] = 300
+    plt.rcParams['font.size'] = 10
+    plt.rcParams['axes.labelsize'] = 11
+    plt.rcParams['axes.titlesize'] = 12
+    plt.rcParams['xtick.labelsize'] = 10
+    plt.rcParams['ytick.labelsize'] = 10
+    plt.rcParams['legend.fontsize'] = 10
 
 
 def create_figure_dir():
@@ -44,6 +48,52 @@ def create_figure_dir():
     return fig_dir
 
 
+def create_cache_dir():
+    """Create cache directory for computed figure data if it doesn't exist"""
+    cache_dir = Path(__file__).parent.parent / 'cache'
+    cache_dir.mkdir(exist_ok=True)
+    return cache_dir
+
+
+# Part of the Arnold-tongue cache key; bump whenever
+# TTST.find_arnold_tongues changes its algorithm or noise generation
+_ARNOLD_CACHE_VERSION = 1
+
+
+def cached_arnold_tongues(model, thermal_range, tidal_range, resolution):
+    """
+    Arnold tongue sync map, loaded from disk when already computed
+
+    The cache file name is a hash of the sweep ranges, the resolution, the
+    model parameters and solar sharpness, and _ARNOLD_CACHE_VERSION. Maps
+    from an unseeded model are not reproducible and are never cached.
+    """
+    if model.params.seed is None:
+        return model.find_arnold_tongues(
+            thermal_range=thermal_range,
+            tidal_range=tidal_range,
+            resolution=resolution
+        )
+
+    key = repr((_ARNOLD_CACHE_VERSION, thermal_range, tidal_range, resolution,
+                model.params, model.sharpness))
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    cache_path = create_cache_dir() / f'arnold_{digest}.npz'
+
+    if cache_path.exists():
+        print(f"  Using cached Arnold tongues from {cache_path}")
+        with np.load(cache_path) as data:
+            return data['sync_map']
+
+    sync_map = model.find_arnold_tongues(
+        thermal_range=thermal_range,
+        tidal_range=tidal_range,
+        resolution=resolution
+    )
+    np.savez_compressed(cache_path, sync_map=sync_map)
+    return sync_map
+
+
 def figure1_conceptual_overview():
     """Figure 1: Conceptual overview of TTST"""
     fig = plt.figure(figsize=(10, 10))
@@ -142,39 +192,57 @@ def figure1_conceptual_overview():
     return fig
 
 
+@functools.lru_cache(maxsize=1)
+def figure2_data():
+    """
+    Simulated rhythms for Figure 2, computed once per session
+
+    Stored as float32, which is ample precision for plotting.
+    """
+    model = TTST(TTSTParameters(seed=0))
+    t, combined = model.simulate(duration=48, dt=0.01)
+
+    return {
+        'time': t.astype(np.float32),
+        'thermal': model.thermal.astype(np.float32),
+        'tidal': model.tidal.astype(np.float32),
+        'solar': model.solar.astype(np.float32),
+        'combined': combined.astype(np.float32)
+    }
+
+
 def figure2_environmental_rhythms():
     """Figure 2: The three environmental rhythms"""
-    # Create TTST simulation
-    model = TTST()
-    t, combined = model.simulate(duration=48, dt=0.01)
+    data = figure2_data()
+    t = data['time']
 
     fig, axes = plt.subplots(4, 1, figsize=(10, 10), sharex=True)
 
     # Thermal
-    axes[0].plot(t, model.thermal, 'r-', linewidth=0.5, alpha=0.8)
-    axes[0].fill_between(t, model.thermal, alpha=0.3, color='red')
+    axes[0].plot(t, data['thermal'], 'r-', linewidth=0.5, alpha=0.8)
+    axes[0].fill_between(t, data['thermal'], alpha=0.3, color='red')
     axes[0].set_ylabel('Thermal\nAmplitude')
     axes[0].set_title('Environmental Rhythms', fontsize=12, fontweight='bold')
     axes[0].grid(True, alpha=0.3)
     axes[0].set_ylim([-2, 2])
 
     # Tidal
-    axes[1].plot(t, model.tidal, 'b-', linewidth=1.5)
-    axes[1].fill_between(t, model.tidal, alpha=0.3, color='blue')
+    axes[1].plot(t, data['tidal'], 'b-', linewidth=1.5)
+    axes[1].fill_between(t, data['tidal'], alpha=0.3, color='blue')
     axes[1].set_ylabel('Tidal\nAmplitude')
     axes[1].grid(True, alpha=0.3)
     axes[1].set_ylim([-1.5, 1.5])
 
     # Solar
-    axes[2].plot(t, model.solar, 'orange', linewidth=2)
-    axes[2].fill_between(t, model.solar, alpha=0.3, color='orange')
+    axes[2].plot(t, data['solar'], 'orange', linewidth=2)
+    axes[2].fill_between(t, data['solar'], alpha=0.3, color='orange')
     axes[2].set_ylabel('Solar\nIntensity')
     axes[2].grid(True, alpha=0.3)
     axes[2].set_ylim([-0.2, 1.7])
 
     # Combined
-    axes[3].plot(t, combined, 'k-', linewidth=1)
-    axes[3].fill_between(t, combined, alpha=0.2, color='gray')
+    axes[3].plot(t, data['combined'], 'k-', linewidth=1)
+    axes[3].fill_between(t, data['combined'], alpha=0.2, color='gray')
     axes[3].set_ylabel('Combined\nRhythm')
     axes[3].set_xlabel('Time (hours)')
     axes[3].grid(True, alpha=0.3)
@@ -195,10 +263,12 @@ def figure2_environmental_rhythms():
 
 def figure3_arnold_tongues():
     """Figure 3: Arnold tongues showing synchronization regions"""
-    model = TTST()
+    # Seeded so the map is reproducible and can be cached
+    model = TTST(TTSTParameters(seed=0))
 
     print("Calculating Arnold tongues (this may take a minute)...")
-    sync_map = model.find_arnold_tongues(
+    sync_map = cached_arnold_tongues(
+        model,
         thermal_range=(0.25, 2.0),
         tidal_range=(10, 15),
         resolution=50
@@ -358,6 +428,7 @@ def main():
     print("TTST Figure Generation")
     print("=" * 50)
 
+    setup_style()
     fig_dir = create_figure_dir()
 
     # Generate figures
@@ -373,14 +444,18 @@ def main():
         print(f"Generating {filename}...")
         fig = fig_func()
 
+        # Compute the tight bounding box once (a full layout pass) and reuse
+        # it for both outputs; pad matches the savefig default of 0.1 inch
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(0.1)
+
         # Save figure
         filepath = fig_dir / filename
-        fig.savefig(filepath, bbox_inches='tight', dpi=300)
+        fig.savefig(filepath, bbox_inches=bbox, dpi=300)
         print(f"  Saved to {filepath}")
 
         # Also save as PNG for viewing
         png_path = filepath.with_suffix('.png')
-        fig.savefig(png_path, bbox_inches='tight', dpi=150)
+        fig.savefig(png_path, bbox_inches=bbox, dpi=150)
 
         plt.close(fig)
 
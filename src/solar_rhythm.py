@@ -7,12 +7,83 @@ Author: Tomoyuki Kano
 License: MIT
 """
 
+import math
 import numpy as np
 from typing import Tuple, Dict, Optional
-import matplotlib.pyplot as plt
 from scipy import interpolate
 from datetime import datetime, timedelta
 
+from time_grid import linspace_grid
+
+try:
+    from numba import njit, prange, types
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# |x| above which the rational tanh below rounds to +/-1 (error < 1e-4)
+_TANH_CLAMP = 4.97
+
+
+if HAS_NUMBA:
+    # Explicit signatures compile the kernels eagerly at import; with
+    # cache=True that cost is paid once per machine. Time grids may be
+    # read-only (see time_grid), hence the second signature.
+    _vec = types.float64[::1]
+    _ro_vec = types.Array(types.float64, 1, 'A', readonly=True)
+    _f8 = types.float64
+
+    @njit([_f8(_f8)], cache=True, fastmath=True)
+    def _tanh_rational(x):
+        """Lambert continued-fraction (7/6 Pade) approximation of tanh"""
+        if x >= _TANH_CLAMP:
+            return 1.0
+        if x <= -_TANH_CLAMP:
+            return -1.0
+        x2 = x * x
+        num = x * (135135.0 + x2 * (17325.0 + x2 * (378.0 + x2)))
+        den = 135135.0 + x2 * (62370.0 + x2 * (3150.0 + 28.0 * x2))
+        return num / den
+
+    @njit([_vec(_vec, _f8, _f8, _vec), _vec(_ro_vec, _f8, _f8, _vec)],
+          parallel=True, fastmath=True, cache=True)
+    def _photoperiod_kernel(t, omega, sharpness, out):
+        """0.5 + 0.5*tanh(sharpness*sin(omega*t)) in a single pass (compiled)"""
+        for i in prange(t.shape[0]):
+            out[i] = 0.5 + 0.5 * _tanh_rational(sharpness * math.sin(omega * t[i]))
+        return out
+
+    @njit([_vec(_vec, _f8, _vec), _vec(_ro_vec, _f8, _vec)],
+          parallel=True, fastmath=True, cache=True)
+    def _light_from_sin_kernel(sin_phase, sharpness, out):
+        """0.5 + 0.5*tanh(sharpness*sin_phase) for precomputed sines (compiled)"""
+        for i in prange(sin_phase.shape[0]):
+            out[i] = 0.5 + 0.5 * _tanh_rational(sharpness * sin_phase[i])
+        return out
+
+    @njit([types.void(t_vec, _f8, _f8, _vec, _vec, _vec) for t_vec in (_vec, _ro_vec)],
+          parallel=True, fastmath=True, cache=True)
+    def _cyanobacteria_kernel(t, omega, sharpness, photosynthesis,
+                              nitrogen_fixation, cell_division):
+        """All three cyanobacteria responses in a single pass (compiled)"""
+        for i in prange(t.shape[0]):
+            light = 0.5 + 0.5 * _tanh_rational(sharpness * math.sin(omega * t[i]))
+            photosynthesis[i] = light * (1 - 0.2 * light * light)
+            nitrogen_fixation[i] = 1 - light
+            d = t[i] % 24.0 - 18.0
+            cell_division[i] = math.exp(-d * d / 8.0)
+
+# Kernels compiled ahead of time by build_aot.py take precedence over JIT
+try:
+    from _ttst_kernels import (
+        photoperiod_kernel as _photoperiod_kernel,
+        light_from_sin_kernel as _light_from_sin_kernel,
+        cyanobacteria_kernel as _cyanobacteria_kernel,
+    )
+    HAS_KERNELS = True
+except ImportError:
+    HAS_KERNELS = HAS_NUMBA
+
 
 class SolarRhythm:
     """Model solar rhythms and day-night cycles"""
@@ -30,28 +101,33 @@ class SolarRhythm:
         self.current_day_length = current_day_length
         self.early_day_length = early_day_length
 
-    def day_length_evolution(self, time_ago: float) -> float:
+        # Photoperiods on the visualization grid, see _cached_photoperiod
+        self._photoperiod_cache = {}
+
+    def day_length_evolution(self, time_ago):
         """
         Calculate day length at given time in Earth's history
 
         Args:
-            time_ago: Time before present in years
+            time_ago: Time before present in years (scalar or array)
 
         Returns:
-            Day length in hours
+            Day length in hours (float for scalar input, else array)
         """
-        if time_ago <= 0:
-            return self.current_day_length
-
         # Simplified model: exponential approach to current value
         # Based on tidal friction slowing Earth's rotation
         tau = 2.5e9  # Time constant in years
 
-        day_length = self.current_day_length - (
-            self.current_day_length - self.early_day_length
-        ) * np.exp(-time_ago / tau)
+        time_ago = np.asarray(time_ago, dtype=np.float64)
+        day_length = np.where(
+            time_ago <= 0,
+            self.current_day_length,
+            self.current_day_length - (
+                self.current_day_length - self.early_day_length
+            ) * np.exp(-time_ago / tau)
+        )
 
-        return day_length
+        return day_length.item() if day_length.ndim == 0 else day_length
 
     def solar_irradiance(self, t: np.ndarray,
                         latitude: float = 0.0,
@@ -71,16 +147,18 @@ class SolarRhythm:
         """
         omega = 2 * np.pi / day_length
 
-        # Solar zenith angle (simplified, no seasons)
-        lat_rad = np.radians(latitude)
-        zenith = np.arccos(np.cos(lat_rad) * np.cos(omega * t))
-
-        # Irradiance (Lambert's cosine law)
-        irradiance = solar_constant * np.maximum(0, np.cos(zenith))
+        # Cosine of the solar zenith angle (simplified, no seasons)
+        # NumPy ufuncs so an array of latitudes broadcasts as before
+        cos_lat = np.cos(np.radians(latitude))
+        cos_zenith = cos_lat * np.cos(omega * np.asarray(t, dtype=np.float64))
+        if isinstance(cos_zenith, np.ndarray):
+            np.maximum(cos_zenith, 0.0, out=cos_zenith)  # fresh array, clip in place
+        else:
+            cos_zenith = np.maximum(cos_zenith, 0.0)  # scalar t
 
-        # Add atmospheric attenuation
+        # Irradiance (Lambert's cosine law) with atmospheric attenuation
         atmosphere_transmission = 0.75
-        irradiance *= atmosphere_transmission
+        irradiance = (solar_constant * atmosphere_transmission) * cos_zenith
 
         return irradiance
 
@@ -100,14 +178,73 @@ class SolarRhythm:
         """
         omega = 2 * np.pi / day_length
 
+        # Sharp transitions with twilight
+        sharpness = 2 * np.pi / twilight_duration
+
+        t = np.asarray(t)
+        if HAS_KERNELS and t.ndim == 1 and t.dtype == np.float64:
+            return _photoperiod_kernel(t, omega, sharpness, np.empty_like(t))
+
         # Base sinusoidal signal
-        base_signal = np.sin(omega * t)
+        return self._photoperiod_from_sin(np.sin(omega * t), twilight_duration)
 
-        # Sharp transitions with twilight
+    def _cached_photoperiod(self, duration: float, n: int,
+                            day_length: float = 24.0,
+                            twilight_duration: float = 0.5) -> np.ndarray:
+        """Read-only photoperiod on the shared visualization grid
+
+        Kept in a per-instance dict rather than an lru_cache on the
+        method, which would hold every instance alive.
+        """
+        key = (duration, n, day_length, twilight_duration)
+        light = self._photoperiod_cache.get(key)
+        if light is None:
+            if len(self._photoperiod_cache) >= 8:
+                self._photoperiod_cache.pop(next(iter(self._photoperiod_cache)))
+            light = self.photoperiod(linspace_grid(duration, n), day_length, twilight_duration)
+            light.setflags(write=False)
+            self._photoperiod_cache[key] = light
+        return light
+
+    @staticmethod
+    def _phase(t: np.ndarray, day_length: float) -> np.ndarray:
+        """Diurnal phase omega*t in radians"""
+        return (2 * np.pi / day_length) * np.asarray(t)
+
+    @staticmethod
+    def _photoperiod_from_sin(sin_phase: np.ndarray,
+                              twilight_duration: float = 0.5) -> np.ndarray:
+        """Light intensity from precomputed sin(omega*t)"""
         sharpness = 2 * np.pi / twilight_duration
-        light_signal = 0.5 + 0.5 * np.tanh(sharpness * base_signal)
+        if HAS_KERNELS and sin_phase.ndim == 1 and sin_phase.dtype == np.float64:
+            return _light_from_sin_kernel(sin_phase, sharpness, np.empty_like(sin_phase))
+        # np.tanh is SIMD-vectorized and beats a rational approximation
+        # evaluated with NumPy ufuncs, so only the temporaries are trimmed
+        light = np.asarray(sharpness * sin_phase)
+        np.tanh(light, out=light)
+        light *= 0.5
+        light += 0.5
+        return light
+
+    @staticmethod
+    def _circadian_from_light(light: np.ndarray, phase: np.ndarray,
+                              light_sensitivity: float = 1.0) -> np.ndarray:
+        """Circadian forcing from a light signal and its diurnal phase"""
+        # Non-photic signals (temperature, feeding, etc.)
+        temperature = 0.3 * np.sin(phase - np.pi/4)  # Temperature lags light
+
+        # Combined forcing
+        return light_sensitivity * light + (1 - light_sensitivity) * temperature
 
-        return light_signal
+    @staticmethod
+    def _uv_from_sin(sin_phase: np.ndarray, ozone_factor: float = 1.0) -> np.ndarray:
+        """UV intensity from precomputed sin(omega*t)"""
+        # Solar elevation affects UV more strongly than visible light
+        elevation = np.clip(sin_phase, 0.0, None)  # sin_phase may be shared
+
+        # UV intensity (stronger at noon), reduced by ozone absorption;
+        # elevation**1.5 as elevation*sqrt(elevation) avoids pow()
+        return (1 - 0.9 * ozone_factor) * elevation * np.sqrt(elevation)
 
     def circadian_forcing(self, t: np.ndarray,
                         day_length: float = 24.0,
@@ -126,14 +263,8 @@ class SolarRhythm:
         # Light signal
         light = self.photoperiod(t, day_length)
 
-        # Non-photic signals (temperature, feeding, etc.)
-        omega = 2 * np.pi / day_length
-        temperature = 0.3 * np.sin(omega * t - np.pi/4)  # Temperature lags light
-
-        # Combined forcing
-        forcing = light_sensitivity * light + (1 - light_sensitivity) * temperature
-
-        return forcing
+        return self._circadian_from_light(light, self._phase(t, day_length),
+                                          light_sensitivity)
 
     def uv_radiation(self, t: np.ndarray,
                     day_length: float = 24.0,
@@ -149,17 +280,7 @@ class SolarRhythm:
         Returns:
             UV radiation intensity
         """
-        # Solar elevation affects UV more strongly than visible light
-        omega = 2 * np.pi / day_length
-        elevation = np.maximum(0, np.sin(omega * t))
-
-        # UV intensity (stronger at noon)
-        uv_base = elevation ** 1.5
-
-        # Ozone absorption
-        uv_surface = uv_base * (1 - 0.9 * ozone_factor)
-
-        return uv_surface
+        return self._uv_from_sin(np.sin(self._phase(t, day_length)), ozone_factor)
 
     def early_earth_solar(self, t: np.ndarray,
                          time_ago: float = 4e9) -> Dict[str, np.ndarray]:
@@ -183,18 +304,63 @@ class SolarRhythm:
         # No ozone layer
         ozone_factor = 0.0 if time_ago > 2.4e9 else (2.4e9 - time_ago) / 2.4e9
 
+        # Share one phase and sine pass between the light-driven signals
+        phase = self._phase(t, day_length)
+        sin_phase = np.sin(phase)
+        light = self._photoperiod_from_sin(sin_phase)
+
         results = {
             'day_length_hours': day_length,
-            'photoperiod': self.photoperiod(t, day_length),
+            'photoperiod': light,
             'irradiance': self.solar_irradiance(t, day_length=day_length,
                                               solar_constant=solar_constant),
-            'uv_radiation': self.uv_radiation(t, day_length, ozone_factor),
-            'circadian_forcing': self.circadian_forcing(t, day_length),
+            'uv_radiation': self._uv_from_sin(sin_phase, ozone_factor),
+            'circadian_forcing': self._circadian_from_light(light, phase),
             'solar_luminosity_fraction': solar_luminosity
         }
 
         return results
 
+    def early_earth_solar_batch(self, t: np.ndarray,
+                                times_ago: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Simulate early Earth solar rhythms for several epochs at once
+
+        Equivalent to calling early_earth_solar for each epoch, but the
+        epoch parameters are broadcast along a leading axis so every signal
+        is computed in one vectorized pass.
+
+        Args:
+            t: Time array in hours, shape (N,)
+            times_ago: Times before present in years, shape (E,)
+
+        Returns:
+            Dictionary with early Earth solar signals; time series have
+            shape (E, N) and per-epoch scalars have shape (E,)
+        """
+        times_ago = np.asarray(times_ago, dtype=np.float64).reshape(-1)
+        t = np.asarray(t)
+
+        # Per-epoch parameters as (E, 1) columns
+        day_length = self.day_length_evolution(times_ago)
+        solar_luminosity = 0.7 + 0.3 * (1 - times_ago / 4.5e9)
+        solar_constant = 1361 * solar_luminosity
+        ozone_factor = np.where(times_ago > 2.4e9, 0.0, (2.4e9 - times_ago) / 2.4e9)
+
+        phase = self._phase(t, day_length[:, None])
+        sin_phase = np.sin(phase)
+        light = self._photoperiod_from_sin(sin_phase.ravel()).reshape(sin_phase.shape)
+
+        return {
+            'day_length_hours': day_length,
+            'photoperiod': light,
+            'irradiance': self.solar_irradiance(t, day_length=day_length[:, None],
+                                              solar_constant=solar_constant[:, None]),
+            'uv_radiation': self._uv_from_sin(sin_phase, ozone_factor[:, None]),
+            'circadian_forcing': self._circadian_from_light(light, phase),
+            'solar_luminosity_fraction': solar_luminosity
+        }
+
     def snowball_earth_solar(self, t: np.ndarray,
                            albedo: float = 0.9) -> Dict[str, np.ndarray]:
         """
@@ -251,19 +417,15 @@ class SolarRhythm:
         # Solar declination
         declination = axial_tilt * np.sin(2 * np.pi * days / 365.25)
 
-        # Day length calculation
-        lat_rad = np.radians(latitude)
+        # Day length calculation (latitude may be an array)
+        tan_lat = np.tan(np.radians(latitude))
         decl_rad = np.radians(declination)
 
-        # Hour angle at sunrise/sunset
-        cos_hour_angle = -np.tan(lat_rad) * np.tan(decl_rad)
-
-        # Handle polar day/night
-        cos_hour_angle = np.clip(cos_hour_angle, -1, 1)
+        # Hour angle at sunrise/sunset, clipped for polar day/night
+        cos_hour_angle = np.clip(-tan_lat * np.tan(decl_rad), -1.0, 1.0)
 
-        # Day length
-        hour_angle = np.arccos(cos_hour_angle)
-        day_length = 2 * hour_angle * 12 / np.pi
+        # Day length: twice the hour angle, converted to hours
+        day_length = (24.0 / np.pi) * np.arccos(cos_hour_angle)
 
         return day_length
 
@@ -279,22 +441,40 @@ class SolarRhythm:
         Returns:
             Dictionary with biological responses
         """
-        light = self.photoperiod(t)
-
+        t = np.asarray(t)
         responses = {}
 
         if organism_type == 'cyanobacteria':
-            # Photosynthesis rate
-            responses['photosynthesis'] = light * (1 - 0.2 * light**2)  # Photoinhibition
+            if HAS_KERNELS and t.ndim == 1 and t.dtype == np.float64:
+                responses = {k: np.empty_like(t) for k in
+                             ('photosynthesis', 'nitrogen_fixation', 'cell_division')}
+                _cyanobacteria_kernel(t, 2 * np.pi / 24.0, 2 * np.pi / 0.5,
+                                      *responses.values())
+                return responses
+
+            light = self.photoperiod(t)
+
+            # Photosynthesis rate with photoinhibition: L*(1 - 0.2*L^2)
+            photosynthesis = light * light
+            photosynthesis *= -0.2
+            photosynthesis += 1
+            photosynthesis *= light
+            responses['photosynthesis'] = photosynthesis
 
             # Nitrogen fixation (higher at night)
             responses['nitrogen_fixation'] = 1 - light
 
             # Cell division (peaks at dusk)
-            omega = 2 * np.pi / 24
-            responses['cell_division'] = np.exp(-((t % 24 - 18)**2) / 8)
+            cell_division = t % 24.0
+            cell_division -= 18
+            np.square(cell_division, out=cell_division)
+            cell_division *= -1 / 8
+            np.exp(cell_division, out=cell_division)
+            responses['cell_division'] = cell_division
 
         elif organism_type == 'early_eukaryote':
+            light = self.photoperiod(t)
+
             # More complex responses
             responses['metabolism'] = 0.5 + 0.5 * light
             responses['dna_repair'] = 0.3 + 0.7 * (1 - light)  # Higher at night
@@ -302,6 +482,31 @@ class SolarRhythm:
 
         return responses
 
+    def _viz_data(self, duration: float = 72.0, n: int = 1000) -> Dict:
+        """
+        Compute the arrays plotted by visualize (no Matplotlib needed)
+
+        Args:
+            duration: Duration to simulate in hours
+            n: Number of time samples
+
+        Returns:
+            Dictionary with the time grid and the plotted signals
+        """
+        t = linspace_grid(duration, n)
+
+        # Both UV curves share one elevation sine
+        sin_phase = np.sin(self._phase(t, 24.0))
+
+        return {
+            't': t,
+            'current': self._cached_photoperiod(duration, n),
+            'early': self.early_earth_solar(t, time_ago=4e9),
+            'uv_with_ozone': self._uv_from_sin(sin_phase, ozone_factor=1.0),
+            'uv_no_ozone': self._uv_from_sin(sin_phase, ozone_factor=0.0),
+            'bio': self.biological_response(t, 'cyanobacteria')
+        }
+
     def visualize(self, duration: float = 72.0):
         """
         Visualize solar rhythms
@@ -309,13 +514,16 @@ class SolarRhythm:
         Args:
             duration: Duration to simulate in hours
         """
-        t = np.linspace(0, duration, 1000)
+        import matplotlib.pyplot as plt
+
+        data = self._viz_data(duration)
+        t = data['t']
 
         fig, axes = plt.subplots(4, 1, figsize=(12, 12))
 
         # Current Earth
         ax = axes[0]
-        current = self.photoperiod(t)
+        current = data['current']
         ax.fill_between(t, 0, current, alpha=0.3, color='yellow', label='Day')
         ax.fill_between(t, 0, 1-current, alpha=0.3, color='blue', label='Night')
         ax.plot(t, current, 'k-', linewidth=1.5)
@@ -327,7 +535,7 @@ class SolarRhythm:
 
         # Early Earth
         ax = axes[1]
-        early = self.early_earth_solar(t, time_ago=4e9)
+        early = data['early']
         ax.plot(t, early['photoperiod'], 'r-', linewidth=1.5)
         ax.set_ylabel('Light Level')
         ax.set_ylim([0, 1])
@@ -339,9 +547,9 @@ class SolarRhythm:
 
         # UV Radiation
         ax = axes[2]
-        ax.plot(t, self.uv_radiation(t, ozone_factor=1.0),
+        ax.plot(t, data['uv_with_ozone'],
                 'g-', label='With ozone', linewidth=1.5)
-        ax.plot(t, self.uv_radiation(t, ozone_factor=0.0),
+        ax.plot(t, data['uv_no_ozone'],
                 'r--', label='No ozone', linewidth=1.5)
         ax.set_ylabel('UV Intensity')
         ax.legend()
@@ -349,7 +557,7 @@ class SolarRhythm:
 
         # Biological response
         ax = axes[3]
-        bio = self.biological_response(t, 'cyanobacteria')
+        bio = data['bio']
         ax.plot(t, bio['photosynthesis'], label='Photosynthesis', linewidth=1.5)
         ax.plot(t, bio['nitrogen_fixation'], label='N2 fixation', linewidth=1.5)
         ax.plot(t, bio['cell_division'], label='Cell division', linewidth=1.5)
@@ -364,6 +572,8 @@ class SolarRhythm:
 
 def main():
     """Demonstrate solar rhythm module"""
+    import matplotlib.pyplot as plt
+
     print("TTST Solar Rhythm Module")
     print("=" * 50)
 
@@ -373,8 +583,9 @@ def main():
     # Show evolution
     times_ago = [4e9, 2.4e9, 600e6, 0]  # Years ago
 
-    for time_ago in times_ago:
-        day_length = solar.day_length_evolution(time_ago)
+    day_lengths = solar.day_length_evolution(np.array(times_ago))
+
+    for time_ago, day_length in zip(times_ago, day_lengths):
         print(f"\nTime: {time_ago/1e9:.1f} Ga")
         print(f"  Day length: {day_length:.1f} hours")
         print(f"  Rotation rate: {24/day_length:.2f}x current")
@@ -7,11 +7,106 @@ Author: Tomoyuki Kano
 License: MIT
 """
 
+import math
 import numpy as np
+from dataclasses import dataclass
 from typing import Tuple, Optional, Dict
 from scipy import signal
 import matplotlib.pyplot as plt
 
+from time_grid import arange_grid
+
+try:
+    from numba import njit, prange, types
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    _vec = types.float64[::1]
+    _ro_vec = types.Array(types.float64, 1, 'A', readonly=True)
+    _f8 = types.float64
+
+    @njit([_vec(_vec, _f8, _vec)], cache=True, fastmath=True)
+    def _ar1(white, alpha, out):
+        """Exponential (AR(1)) smoothing of white noise (compiled)"""
+        out[0] = white[0]
+        for i in range(1, white.shape[0]):
+            out[i] = (1 - alpha) * out[i-1] + alpha * white[i]
+        return out
+
+    @njit([_f8(_vec, _vec, _vec, _vec, _vec)], cache=True, fastmath=True)
+    def _fuse_total(a, b, c, d, out):
+        """Sum four components into out and return max |out| (compiled)"""
+        peak = 0.0
+        for i in range(out.shape[0]):
+            total = a[i] + b[i] + c[i] + d[i]
+            out[i] = total
+            peak = max(peak, abs(total))
+        return peak
+
+    @njit([_vec(t_vec, _f8, _f8, _f8, _f8, _vec) for t_vec in (_vec, _ro_vec)],
+          parallel=True, fastmath=True, cache=True)
+    def _pressure_kernel(t, w1, w2, w3, scale, out):
+        """Three-component pressure signal in a single pass (compiled)"""
+        p2 = math.pi / 3
+        p3 = 2 * math.pi / 3
+        for i in prange(t.shape[0]):
+            out[i] = scale * (0.5 * math.sin(w1 * t[i]) +
+                              0.3 * math.sin(w2 * t[i] + p2) +
+                              0.2 * math.sin(w3 * t[i] + p3))
+        return out
+
+    @njit([_vec(t_vec, _f8, _f8, _vec) for t_vec in (_vec, _ro_vec)],
+          parallel=True, fastmath=True, cache=True)
+    def _convection_kernel(t, omega, amplitude, out):
+        """Convective mode with its 2nd and 3rd harmonics in one pass (compiled)"""
+        r = math.sqrt(0.5)
+        for i in prange(t.shape[0]):
+            s = math.sin(omega * t[i])
+            c = math.cos(omega * t[i])
+            s2 = 2 * s * c
+            c2 = 1 - 2 * s * s
+            # sin(2b + pi/4) = (s2 + c2)/sqrt(2); sin(3b + pi/2) = cos(3b)
+            out[i] = amplitude * (s + 0.3 * r * (s2 + c2) + 0.1 * (c * c2 - s * s2))
+        return out
+
+try:
+    from _ttst_kernels import (
+        ar1 as _ar1,
+        fuse_total as _fuse_total,
+        pressure_kernel as _pressure_kernel,
+        convection_kernel as _convection_kernel,
+    )
+    HAS_KERNELS = True
+except ImportError:
+    HAS_KERNELS = HAS_NUMBA
+
+
+@dataclass
+class ThermalBuffers:
+    """
+    Preallocated output arrays for composite_thermal_signal
+
+    Passing the same buffers to repeated calls with equally long time
+    arrays reuses them instead of allocating six new arrays per call. The
+    returned dictionary then refers to these arrays, so results are
+    overwritten by the next call.
+    """
+    n: int
+    convection: Optional[np.ndarray] = None
+    pressure: Optional[np.ndarray] = None
+    chemical: Optional[np.ndarray] = None
+    stochastic: Optional[np.ndarray] = None
+    total: Optional[np.ndarray] = None
+    temperature: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        for name in ('convection', 'pressure', 'chemical', 'stochastic',
+                     'total', 'temperature'):
+            setattr(self, name, np.empty(self.n))
+
 
 class ThermalRhythm:
     """Model thermal oscillations from hydrothermal vents"""
@@ -19,7 +114,8 @@ class ThermalRhythm:
     def __init__(self,
                  base_period: float = 0.5,
                  amplitude: float = 1.0,
-                 temperature_range: Tuple[float, float] = (2, 400)):
+                 temperature_range: Tuple[float, float] = (2, 400),
+                 seed: Optional[int] = None):
         """
         Initialize thermal rhythm model
 
@@ -27,54 +123,117 @@ class ThermalRhythm:
             base_period: Base oscillation period in hours
             amplitude: Oscillation amplitude
             temperature_range: Temperature range (min, max) in Celsius
+            seed: Seed for the noise generator (None = fresh entropy)
         """
         self.base_period = base_period
         self.amplitude = amplitude
         self.temp_min, self.temp_max = temperature_range
         self.temp_mean = (self.temp_min + self.temp_max) / 2
         self.temp_amplitude = (self.temp_max - self.temp_min) / 2
+        self._rng = np.random.default_rng(seed)
 
     def convective_oscillation(self, t: np.ndarray,
-                              rayleigh_number: float = 1e6) -> np.ndarray:
+                              rayleigh_number: float = 1e6,
+                              out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Model convective oscillations based on Rayleigh-Bénard convection
 
         Args:
             t: Time array in hours
-            rayleigh_number: Rayleigh number for convection
+            rayleigh_number: Rayleigh number for convection, or an array of
+                shape (R,) to sweep several at once
+            out: Optional float64 array to write the result into
 
         Returns:
-            Convective oscillation signal
+            Convective oscillation signal; shape (R, len(t)) for a sweep
         """
         # Critical Rayleigh number for onset of convection
         Ra_critical = 1708
 
+        if np.ndim(rayleigh_number) > 0:
+            return self._convective_sweep(t, rayleigh_number, Ra_critical, out)
+
         if rayleigh_number < Ra_critical:
             # No convection - steady state
-            return np.zeros_like(t)
+            if out is None:
+                return np.zeros_like(t)
+            out.fill(0.0)
+            return out
 
         # Frequency scales with sqrt(Ra - Ra_c)
         freq_factor = np.sqrt((rayleigh_number - Ra_critical) / Ra_critical)
 
         # Primary convective mode
         omega1 = 2 * np.pi / (self.base_period / freq_factor)
-        oscillation = self.amplitude * np.sin(omega1 * t)
+
+        if rayleigh_number <= 1e5:
+            return np.multiply(self.amplitude, np.sin(omega1 * t), out=out)
 
         # Add higher harmonics for turbulent convection
-        if rayleigh_number > 1e5:
-            oscillation += 0.3 * self.amplitude * np.sin(2 * omega1 * t + np.pi/4)
-            oscillation += 0.1 * self.amplitude * np.sin(3 * omega1 * t + np.pi/2)
+        t = np.asarray(t)
+        if HAS_KERNELS and t.ndim == 1 and t.dtype == np.float64:
+            return _convection_kernel(t, omega1, self.amplitude,
+                                      np.empty_like(t) if out is None else out)
+
+        oscillation = self._convective_modes(omega1 * t, 1.0)
+
+        return np.multiply(self.amplitude, oscillation, out=out)
+
+    @staticmethod
+    def _convective_modes(base: np.ndarray, harmonics) -> np.ndarray:
+        """
+        Fundamental plus harmonics weighted by a 0/1 mask
+
+        The 2nd and 3rd harmonics come from sin/cos of the fundamental via
+        the angle-addition identities:
+        sin(2b + pi/4) = (s2 + c2)/sqrt(2), sin(3b + pi/2) = cos(3b)
+        """
+        s = np.sin(base)
+        c = np.cos(base)
+        s2 = 2 * s * c
+        c2 = 1 - 2 * s * s
+        c3 = c * c2 - s * s2
+        return s + harmonics * (0.3 * np.sqrt(0.5) * (s2 + c2) + 0.1 * c3)
+
+    def _convective_sweep(self, t: np.ndarray, rayleigh_numbers: np.ndarray,
+                          Ra_critical: float,
+                          out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Convective oscillations for an array of Rayleigh numbers
+
+        The onset and turbulence thresholds become 0/1 masks, so the whole
+        sweep is evaluated without a per-Rayleigh-number branch.
+
+        Args:
+            t: Time array in hours, shape (N,)
+            rayleigh_numbers: Rayleigh numbers, shape (R,)
+            Ra_critical: Critical Rayleigh number for onset of convection
+            out: Optional float64 array of shape (R, N) to write into
+
+        Returns:
+            Convective oscillation signals, shape (R, N)
+        """
+        ra = np.asarray(rayleigh_numbers, dtype=np.float64).reshape(-1, 1)
+
+        convecting = (ra >= Ra_critical).astype(np.float64)
+        turbulent = (ra > 1e5).astype(np.float64)
+        freq_factor = np.sqrt(np.maximum(ra - Ra_critical, 0.0) / Ra_critical)
 
-        return oscillation
+        omega1 = 2 * np.pi * freq_factor / self.base_period
+        oscillation = self._convective_modes(omega1 * np.asarray(t), turbulent)
+
+        return np.multiply(self.amplitude * convecting, oscillation, out=out)
 
     def pressure_fluctuations(self, t: np.ndarray,
-                            depth: float = 3000) -> np.ndarray:
+                            depth: float = 3000,
+                            out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Model pressure-driven fluctuations at hydrothermal vents
 
         Args:
             t: Time array in hours
             depth: Ocean depth in meters
+            out: Optional float64 array to write the result into
 
         Returns:
             Pressure fluctuation signal
@@ -87,22 +246,32 @@ class ThermalRhythm:
         f2 = 1 / (self.base_period * 1.5)  # Slow component
         f3 = 1 / (self.base_period * 3.0)  # Very slow component
 
+        scale = pressure_factor * self.amplitude
+
+        t = np.asarray(t)
+        if HAS_KERNELS and t.ndim == 1 and t.dtype == np.float64:
+            return _pressure_kernel(t, 2 * np.pi * f1, 2 * np.pi * f2,
+                                    2 * np.pi * f3, scale,
+                                    np.empty_like(t) if out is None else out)
+
         signal_components = (
             0.5 * np.sin(2 * np.pi * f1 * t) +
             0.3 * np.sin(2 * np.pi * f2 * t + np.pi/3) +
             0.2 * np.sin(2 * np.pi * f3 * t + 2*np.pi/3)
         )
 
-        return pressure_factor * self.amplitude * signal_components
+        return np.multiply(scale, signal_components, out=out)
 
     def chemical_oscillations(self, t: np.ndarray,
-                            pH_variation: float = 2.0) -> np.ndarray:
+                            pH_variation: float = 2.0,
+                            out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Model chemical oscillations (e.g., pH, redox potential)
 
         Args:
             t: Time array in hours
             pH_variation: Range of pH variation
+            out: Optional float64 array to write the result into
 
         Returns:
             Chemical oscillation signal
@@ -114,14 +283,18 @@ class ThermalRhythm:
         base_signal = np.sin(omega * t)
         relaxation = np.tanh(5 * base_signal)
 
-        # Add chemical reaction noise
-        reaction_noise = 0.1 * np.random.randn(len(t))
+        # Add chemical reaction noise, accumulating in the output array
+        chemical = self._rng.standard_normal(len(t), out=out)
+        chemical *= 0.1
+        chemical += relaxation
+        chemical *= pH_variation
 
-        return pH_variation * (relaxation + reaction_noise)
+        return chemical
 
     def stochastic_pulsations(self, t: np.ndarray,
                             correlation_time: float = 0.1,
-                            noise_level: float = 0.2) -> np.ndarray:
+                            noise_level: float = 0.2,
+                            out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Generate stochastic pulsations with temporal correlation
 
@@ -129,6 +302,7 @@ class ThermalRhythm:
             t: Time array in hours
             correlation_time: Correlation time for noise
             noise_level: Noise intensity
+            out: Optional float64 array to write the result into
 
         Returns:
             Correlated noise signal
@@ -137,22 +311,34 @@ class ThermalRhythm:
         n_points = len(t)
 
         # Generate white noise
-        white_noise = np.random.randn(n_points)
+        white_noise = self._rng.standard_normal(n_points, out=out)
 
         # Apply exponential filter for correlation
         alpha = dt / (correlation_time + dt)
-        filtered_noise = np.zeros(n_points)
-        filtered_noise[0] = white_noise[0]
+        if n_points == 0:
+            return white_noise
 
-        for i in range(1, n_points):
-            filtered_noise[i] = (1 - alpha) * filtered_noise[i-1] + alpha * white_noise[i]
+        # y[i] = (1 - alpha)*y[i-1] + alpha*x[i] with y[0] = x[0]
+        if HAS_KERNELS:
+            # x[i] is read before y[i] is written, so filter in place
+            filtered_noise = _ar1(white_noise, alpha, white_noise)
+        else:
+            filtered_noise, _ = signal.lfilter(
+                [alpha], [1.0, -(1.0 - alpha)], white_noise,
+                zi=[(1.0 - alpha) * white_noise[0]]
+            )
+            if out is not None:
+                out[:] = filtered_noise
+                filtered_noise = out
 
-        return noise_level * self.amplitude * filtered_noise
+        filtered_noise *= noise_level * self.amplitude
+        return filtered_noise
 
     def composite_thermal_signal(self, t: np.ndarray,
                                rayleigh: float = 1e6,
                                depth: float = 3000,
-                               include_stochastic: bool = True) -> Dict[str, np.ndarray]:
+                               include_stochastic: bool = True,
+                               buffers: Optional[ThermalBuffers] = None) -> Dict[str, np.ndarray]:
         """
         Generate composite thermal signal with all components
 
@@ -161,29 +347,46 @@ class ThermalRhythm:
             rayleigh: Rayleigh number
             depth: Ocean depth in meters
             include_stochastic: Whether to include stochastic component
+            buffers: Output arrays to reuse (see ThermalBuffers); allocated
+                when None
 
         Returns:
             Dictionary with signal components and total
         """
+        if buffers is None:
+            buffers = ThermalBuffers(len(t))
+        elif buffers.n != len(t):
+            raise ValueError(f"Buffers hold {buffers.n} samples, got {len(t)}")
+
         components = {
-            'convection': self.convective_oscillation(t, rayleigh),
-            'pressure': self.pressure_fluctuations(t, depth),
-            'chemical': self.chemical_oscillations(t)
+            'convection': self.convective_oscillation(t, rayleigh, out=buffers.convection),
+            'pressure': self.pressure_fluctuations(t, depth, out=buffers.pressure),
+            'chemical': self.chemical_oscillations(t, out=buffers.chemical)
         }
 
         if include_stochastic:
-            components['stochastic'] = self.stochastic_pulsations(t)
+            components['stochastic'] = self.stochastic_pulsations(t, out=buffers.stochastic)
         else:
-            components['stochastic'] = np.zeros_like(t)
-
-        # Combine all components
-        components['total'] = sum(components.values())
+            buffers.stochastic.fill(0.0)
+            components['stochastic'] = buffers.stochastic
+
+        # Combine all components, tracking the peak for normalization
+        total = buffers.total
+        if HAS_KERNELS:
+            peak = _fuse_total(buffers.convection, buffers.pressure,
+                               buffers.chemical, buffers.stochastic, total)
+        else:
+            np.add(buffers.convection, buffers.pressure, out=total)
+            total += buffers.chemical
+            total += buffers.stochastic
+            peak = np.max(np.abs(total))
+        components['total'] = total
 
         # Convert to temperature
-        components['temperature'] = (
-            self.temp_mean +
-            self.temp_amplitude * components['total'] / np.max(np.abs(components['total']))
-        )
+        temperature = np.multiply(self.temp_amplitude / peak, total,
+                                  out=buffers.temperature)
+        temperature += self.temp_mean
+        components['temperature'] = temperature
 
         return components
 
@@ -212,7 +415,7 @@ class ThermalRhythm:
         # Add additional high-frequency components from more active volcanism
         volcanic_pulses = 0.5 * self.amplitude * np.sin(
             2 * np.pi * t / (self.base_period / 3) +
-            np.random.random() * 2 * np.pi
+            self._rng.random() * 2 * np.pi
         )
 
         signals['volcanic'] = volcanic_pulses
@@ -220,21 +423,37 @@ class ThermalRhythm:
 
         return signals
 
-    def power_spectrum(self, signal: np.ndarray,
+    def power_spectrum(self, x: np.ndarray,
                       sampling_rate: float = 100) -> Tuple[np.ndarray, np.ndarray]:
         """
         Calculate power spectrum of thermal signal
 
         Args:
-            signal: Input signal
+            x: Input signal
             sampling_rate: Sampling rate in samples per hour
 
         Returns:
             Frequencies and power spectrum
         """
-        freqs, psd = signal.welch(signal, fs=sampling_rate, nperseg=min(256, len(signal)))
+        # Largest power-of-two segment up to 256 samples (radix-2 FFT sizes)
+        nperseg = 1 << (min(256, len(x)).bit_length() - 1)
+        freqs, psd = signal.welch(x, fs=sampling_rate, nperseg=nperseg)
         return freqs, psd
 
+    def _viz_data(self, duration: float = 24.0, dt: float = 0.01) -> Dict:
+        """
+        Compute the arrays plotted by visualize (no Matplotlib needed)
+
+        Args:
+            duration: Duration in hours
+            dt: Time step in hours
+
+        Returns:
+            Dictionary with the time grid 't' and the composite signals
+        """
+        t = arange_grid(duration, dt)
+        return {'t': t, **self.composite_thermal_signal(t)}
+
     def visualize(self, duration: float = 24.0, dt: float = 0.01):
         """
         Visualize thermal rhythm components
@@ -243,8 +462,8 @@ class ThermalRhythm:
             duration: Duration in hours
             dt: Time step in hours
         """
-        t = np.arange(0, duration, dt)
-        signals = self.composite_thermal_signal(t)
+        signals = self._viz_data(duration, dt)
+        t = signals['t']
 
         fig, axes = plt.subplots(3, 1, figsize=(12, 10))
 
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Shared time grids for the TTST rhythm modules
+
+Author: Tomoyuki Kano
+License: MIT
+"""
+
+import functools
+import numpy as np
+
+
+@functools.lru_cache(maxsize=8)
+def linspace_grid(duration: float, n: int) -> np.ndarray:
+    """Read-only time grid of n points over [0, duration], shared between calls"""
+    t = np.linspace(0, duration, n)
+    t.setflags(write=False)
+    return t
+
+
+@functools.lru_cache(maxsize=8)
+def arange_grid(duration: float, dt: float) -> np.ndarray:
+    """Read-only time grid with step dt over [0, duration), shared between calls"""
+    t = np.arange(0, duration, dt)
+    t.setflags(write=False)
+    return t
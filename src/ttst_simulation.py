@@ -7,15 +7,134 @@ Author: Tomoyuki Kano
 License: MIT
 """
 
+import ctypes
+import math
 import numpy as np
 import json
-import pandas as pd
 from typing import Tuple, Dict, Optional
 from dataclasses import dataclass
-import matplotlib.pyplot as plt
-from scipy import signal
+from scipy import fft as sp_fft
 from pathlib import Path
 
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# C version of the fused rhythm kernel, built by build_aot.py
+try:
+    _libttst = np.ctypeslib.load_library('libttst_kernel', Path(__file__).parent)
+    _f64_array = np.ctypeslib.ndpointer(dtype=np.float64, flags='C_CONTIGUOUS')
+    _libttst.ttst_kernel.restype = None
+    _libttst.ttst_kernel.argtypes = (
+        [_f64_array, ctypes.c_size_t] + [ctypes.c_double] * 7
+        + [_f64_array] + [ctypes.c_double] * 4 + [_f64_array] * 4
+    )
+    HAS_C_KERNEL = True
+except OSError:
+    HAS_C_KERNEL = False
+
+try:
+    import cupy as cp
+    import cupyx.scipy.fft as cp_fft
+    HAS_CUPY = True
+except ImportError:
+    HAS_CUPY = False
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _ttst_kernel(t, w_thermal, w_tidal, w_solar,
+                     a_thermal, a_tidal, a_solar, noise_level, noise,
+                     sharpness, alpha, beta, gamma,
+                     thermal, tidal, solar, combined):
+        """Thermal, tidal, solar and coupled rhythms in one pass (compiled)
+
+        A sharpness of 0.0 selects the square-wave solar rhythm; simulate()
+        passes it for TTST.sharpness = None (user values must be > 0).
+        """
+        for i in prange(t.shape[0]):
+            x = w_thermal * t[i]
+            th = (a_thermal * math.sin(x)
+                  + 0.3 * math.sin(2.0 * x + math.pi / 4)
+                  + noise_level * noise[i])
+
+            s = math.sin(w_tidal * t[i])
+            ti = a_tidal * s + 0.2 * s * s
+
+            s = math.sin(w_solar * t[i])
+            if sharpness > 0.0:
+                edge = math.tanh(sharpness * s)
+            elif s > 0.0:
+                edge = 1.0
+            elif s < 0.0:
+                edge = -1.0
+            else:
+                edge = 0.0
+            so = 0.5 * a_solar * (1.0 + edge)
+
+            thermal[i] = th
+            tidal[i] = ti
+            solar[i] = so
+            combined[i] = (th + ti + so
+                           + alpha * th * ti + beta * ti * so + gamma * so * th)
+
+
+if HAS_C_KERNEL:
+    def _ttst_kernel_c(t, w_thermal, w_tidal, w_solar,
+                       a_thermal, a_tidal, a_solar, noise_level, noise,
+                       sharpness, alpha, beta, gamma,
+                       thermal, tidal, solar, combined):
+        """_ttst_kernel through the compiled C library (sharpness 0.0 =
+        square wave, as in the numba kernel)"""
+        _libttst.ttst_kernel(t, t.size, w_thermal, w_tidal, w_solar,
+                             a_thermal, a_tidal, a_solar, noise_level, noise,
+                             sharpness, alpha, beta, gamma,
+                             thermal, tidal, solar, combined)
+    _fused_kernel = _ttst_kernel_c
+elif HAS_NUMBA:
+    _fused_kernel = _ttst_kernel
+else:
+    _fused_kernel = None
+
+
+def _analytic_signal(x: np.ndarray, n_fft: Optional[int] = None,
+                     fft=sp_fft) -> np.ndarray:
+    """Analytic signal along the last axis, using a real-input FFT
+
+    Equivalent to scipy.signal.hilbert, but the forward transform is an
+    rfft (half the work of a complex FFT on real data) and the length is
+    zero-padded to n_fft, then cropped back. Worker threads follow the
+    enclosing scipy.fft.set_workers context.
+
+    Args:
+        x: Real signal(s), transformed along the last axis
+        n_fft: Transform length. If None, uses scipy.fft.next_fast_len.
+        fft: scipy.fft-compatible module (cupyx.scipy.fft for device arrays)
+
+    Returns:
+        Complex analytic signal with the same shape as x
+    """
+    n = x.shape[-1]
+    if n_fft is None:
+        n_fft = sp_fft.next_fast_len(n, real=True)
+    half = fft.rfft(x, n=n_fft, axis=-1)
+
+    # One-sided spectrum: keep DC (and Nyquist), double positive bins
+    spectrum = np.zeros_like(half, shape=x.shape[:-1] + (n_fft,))
+    spectrum[..., :half.shape[-1]] = half
+    spectrum[..., 1:(n_fft + 1) // 2] *= 2
+
+    return fft.ifft(spectrum, axis=-1, overwrite_x=True)[..., :n]
+
+
+def _band_vertices(x0: np.ndarray, x1: np.ndarray) -> np.ndarray:
+    """(D, 4, 2) rectangles spanning [x0, x1] and the full axes height"""
+    zeros, ones = np.zeros_like(x0), np.ones_like(x0)
+    return np.stack([np.column_stack(corner) for corner in
+                     ((x0, zeros), (x0, ones), (x1, ones), (x1, zeros))], axis=1)
+
 
 @dataclass
 class TTSTParameters:
@@ -28,11 +147,17 @@ class TTSTParameters:
     solar_amplitude: float = 1.0
     coupling_strength: float = 0.3
     noise_level: float = 0.1
+    seed: Optional[int] = None  # noise generator seed (None = fresh entropy)
 
 
 class TTST:
     """Main TTST simulation class"""
 
+    # Day-night edge of the solar rhythm: None gives a square wave, a
+    # positive float gives 0.5 + 0.5*tanh(sharpness*sin) (10.0 was the old
+    # default); anything else raises ValueError
+    sharpness: Optional[float] = None
+
     def __init__(self, params: Optional[TTSTParameters] = None):
         """Initialize TTST simulation
 
@@ -42,13 +167,24 @@ class TTST:
         self.params = params or TTSTParameters()
         self.load_data()
         self.time = None
+        self._fft_N = None
         self.combined_rhythm = None
         self.thermal = None
         self.tidal = None
         self.solar = None
+        self._thermal_analytic = None
+        self._tidal_analytic = None
+        self._rng = np.random.default_rng(self.params.seed)
+        self._noise_buf = None
+        self._vis_fig, self._vis_lines, self._vis_key = None, None, None
 
-    def load_data(self):
-        """Load configuration data from JSON and CSV files"""
+    def load_data(self, dataframe: bool = False):
+        """Load configuration data from JSON and CSV files
+
+        Args:
+            dataframe: Load early_earth_params.csv as a pandas DataFrame
+                instead of a NumPy structured array (imports pandas)
+        """
         # Try to load from data directory
         data_dir = Path(__file__).parent.parent / 'data'
 
@@ -59,8 +195,14 @@ class TTST:
             # Use default configuration if file not found
             self.rhythm_config = self._get_default_config()
 
-        if (data_dir / 'early_earth_params.csv').exists():
-            self.earth_params = pd.read_csv(data_dir / 'early_earth_params.csv')
+        params_path = data_dir / 'early_earth_params.csv'
+        if params_path.exists() and dataframe:
+            import pandas as pd
+            self.earth_params = pd.read_csv(params_path)
+        elif params_path.exists():
+            # Structured array with one field per column header
+            self.earth_params = np.genfromtxt(params_path, delimiter=',', names=True,
+                                              dtype=None, encoding='utf-8')
         else:
             self.earth_params = None
 
@@ -75,47 +217,70 @@ class TTST:
             }
         }
 
-    def thermal_rhythm(self, t: np.ndarray) -> np.ndarray:
+    def thermal_rhythm(self, t: np.ndarray,
+                       period: Optional[np.ndarray] = None) -> np.ndarray:
         """Calculate thermal rhythm signal
 
         Args:
             t: Time array in hours
+            period: Thermal period(s) in hours; defaults to
+                params.thermal_period. An (R, 1) column gives R rows.
 
         Returns:
             Thermal rhythm signal
         """
+        if period is None:
+            period = self.params.thermal_period
+
         # Primary oscillation
         primary = self.params.thermal_amplitude * np.sin(
-            2 * np.pi * t / self.params.thermal_period
+            2 * np.pi * t / period
         )
 
         # Add harmonics
         second_harmonic = 0.3 * np.sin(
-            4 * np.pi * t / self.params.thermal_period + np.pi/4
+            4 * np.pi * t / period + np.pi/4
         )
 
         # Add stochastic component
-        noise = self.params.noise_level * np.random.randn(len(t))
+        noise = self._standard_normal(primary.shape)
+        noise *= self.params.noise_level
 
         return primary + second_harmonic + noise
 
-    def tidal_rhythm(self, t: np.ndarray) -> np.ndarray:
+    def _standard_normal(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Fresh Gaussian noise in a buffer reused while the shape is unchanged
+
+        The buffer is overwritten on the next call, so callers must not
+        keep it.
+        """
+        if self._noise_buf is None or self._noise_buf.shape != shape:
+            self._noise_buf = np.empty(shape)
+        return self._rng.standard_normal(out=self._noise_buf)
+
+    def tidal_rhythm(self, t: np.ndarray,
+                     period: Optional[np.ndarray] = None) -> np.ndarray:
         """Calculate tidal rhythm signal
 
         Args:
             t: Time array in hours
+            period: Tidal period(s) in hours; defaults to
+                params.tidal_period. An (R, 1) column gives R rows.
 
         Returns:
             Tidal rhythm signal
         """
+        if period is None:
+            period = self.params.tidal_period
+
         # Primary M2 tide
         M2 = self.params.tidal_amplitude * np.sin(
-            2 * np.pi * t / self.params.tidal_period
+            2 * np.pi * t / period
         )
 
         # Nonlinear component (squared term)
         nonlinear = 0.2 * np.sin(
-            2 * np.pi * t / self.params.tidal_period
+            2 * np.pi * t / period
         ) ** 2
 
         return M2 + nonlinear
@@ -129,31 +294,50 @@ class TTST:
         Returns:
             Solar rhythm signal (sharp day-night transitions)
         """
-        # Use tanh for sharp transitions
-        sharpness = 10.0
-        base_signal = np.sin(2 * np.pi * t / self.params.solar_period)
-
-        return self.params.solar_amplitude * (
-            0.5 + 0.5 * np.tanh(sharpness * base_signal)
-        )
-
-    def simulate(self, duration: float = 100.0, dt: float = 0.01) -> Tuple[np.ndarray, np.ndarray]:
+        # Square day-night wave from the sign of the solar phase; a finite
+        # sharpness restores the soft tanh edge
+        sharpness = self._solar_sharpness()
+        rhythm = np.multiply(t, 2 * np.pi / self.params.solar_period)
+        np.sin(rhythm, out=rhythm)
+
+        if sharpness is None:
+            np.sign(rhythm, out=rhythm)
+        else:
+            rhythm *= sharpness
+            np.tanh(rhythm, out=rhythm)
+
+        rhythm += 1.0
+        rhythm *= 0.5 * self.params.solar_amplitude
+        return rhythm
+
+    def _solar_sharpness(self) -> Optional[float]:
+        """TTST.sharpness, checked to be None or a positive number"""
+        if self.sharpness is not None and not self.sharpness > 0:
+            raise ValueError(
+                f"sharpness must be None or positive, got {self.sharpness!r}")
+        return self.sharpness
+
+    def simulate(self, duration: float = 100.0, dt: float = 0.01,
+                 pad_fft: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """Run TTST simulation
 
         Args:
             duration: Simulation duration in hours
             dt: Time step in hours
+            pad_fft: Zero-pad the Hilbert transforms used for
+                synchronization to the next FFT-friendly length. If False,
+                they use the exact number of samples.
 
         Returns:
             Tuple of (time array, combined rhythm signal)
         """
         # Create time array
         self.time = np.arange(0, duration, dt)
+        n = self.time.size
+        self._fft_N = sp_fft.next_fast_len(n, real=True) if pad_fft else n
 
-        # Calculate individual rhythms
-        self.thermal = self.thermal_rhythm(self.time)
-        self.tidal = self.tidal_rhythm(self.time)
-        self.solar = self.solar_rhythm(self.time)
+        self._thermal_analytic = None
+        self._tidal_analytic = None
 
         # Get coupling parameters
         coupling = self.rhythm_config.get('coupling_parameters', {})
@@ -161,30 +345,88 @@ class TTST:
         beta = coupling.get('tidal_solar_coupling', 0.5)
         gamma = coupling.get('solar_thermal_coupling', 0.2)
 
-        # Calculate coupled signal with nonlinear interactions
-        self.combined_rhythm = (
-            self.thermal +
-            self.tidal +
-            self.solar +
-            alpha * self.thermal * self.tidal +
-            beta * self.tidal * self.solar +
-            gamma * self.solar * self.thermal
-        )
+        if _fused_kernel is not None and self.time.dtype == np.float64:
+            # All four signals from one compiled loop; the noise is drawn
+            # here so the random stream matches thermal_rhythm
+            p = self.params
+            # The kernels encode the square wave as sharpness 0.0 rather
+            # than NaN, which fastmath builds may not compare reliably
+            sharpness = self._solar_sharpness()
+            if sharpness is None:
+                sharpness = 0.0
+            noise = self._standard_normal((n,))
+            self.thermal = np.empty(n)
+            self.tidal = np.empty(n)
+            self.solar = np.empty(n)
+            self.combined_rhythm = np.empty(n)
+            _fused_kernel(self.time,
+                          2 * np.pi / p.thermal_period,
+                          2 * np.pi / p.tidal_period,
+                          2 * np.pi / p.solar_period,
+                          p.thermal_amplitude, p.tidal_amplitude,
+                          p.solar_amplitude, p.noise_level, noise,
+                          sharpness, alpha, beta, gamma,
+                          self.thermal, self.tidal, self.solar,
+                          self.combined_rhythm)
+            return self.time, self.combined_rhythm
+
+        # Calculate individual rhythms
+        self.thermal = self.thermal_rhythm(self.time)
+        self.tidal = self.tidal_rhythm(self.time)
+        self.solar = self.solar_rhythm(self.time)
+
+        # Calculate coupled signal with nonlinear interactions, accumulating
+        # in place with a single scratch array for the pairwise products
+        combined = np.add(self.thermal, self.tidal)
+        combined += self.solar
+
+        scratch = np.multiply(self.thermal, self.tidal)
+        scratch *= alpha
+        combined += scratch
+
+        np.multiply(self.tidal, self.solar, out=scratch)
+        scratch *= beta
+        combined += scratch
+
+        np.multiply(self.solar, self.thermal, out=scratch)
+        scratch *= gamma
+        combined += scratch
+
+        self.combined_rhythm = combined
 
         return self.time, self.combined_rhythm
 
-    def calculate_synchronization(self) -> float:
+    def calculate_synchronization(self, fast: bool = False) -> float:
         """Calculate synchronization index between rhythms
 
+        Args:
+            fast: Use the analytic phases of the primary sinusoids,
+                2*pi*t/period - pi/2, instead of Hilbert transforms. This
+                skips both FFTs but ignores the harmonics and noise, so it
+                approximates the FFT result and does not reflect signals
+                assigned to self.thermal or self.tidal by hand.
+
         Returns:
             Synchronization index (0-1)
         """
         if self.thermal is None or self.tidal is None:
             raise ValueError("Must run simulate() first")
 
+        if fast:
+            # The -pi/2 offsets cancel in the phase difference
+            beat = 2 * np.pi * (1 / self.params.thermal_period
+                                - 1 / self.params.tidal_period)
+            return np.abs(np.mean(np.exp(1j * beat * self.time)))
+
+        # Analytic signals are computed once per simulate() run
+        if self._thermal_analytic is None:
+            with sp_fft.set_workers(-1):
+                self._thermal_analytic = _analytic_signal(self.thermal, self._fft_N)
+                self._tidal_analytic = _analytic_signal(self.tidal, self._fft_N)
+
         # Calculate phase synchronization using Hilbert transform
-        thermal_phase = np.angle(signal.hilbert(self.thermal))
-        tidal_phase = np.angle(signal.hilbert(self.tidal))
+        thermal_phase = np.angle(self._thermal_analytic)
+        tidal_phase = np.angle(self._tidal_analytic)
 
         # Phase difference
         phase_diff = thermal_phase - tidal_phase
@@ -197,39 +439,55 @@ class TTST:
     def find_arnold_tongues(self,
                           thermal_range: Tuple[float, float] = (0.25, 2.0),
                           tidal_range: Tuple[float, float] = (10, 15),
-                          resolution: int = 50) -> np.ndarray:
+                          resolution: int = 50,
+                          backend: str = 'auto') -> np.ndarray:
         """Find Arnold tongue synchronization regions
 
         Args:
             thermal_range: Range of thermal periods to test
             tidal_range: Range of tidal periods to test
             resolution: Grid resolution
+            backend: 'cpu', 'cuda', or 'auto' (CUDA via CuPy when a GPU
+                is available)
 
         Returns:
             2D array of synchronization strengths
         """
+        if backend not in ('auto', 'cpu', 'cuda'):
+            raise ValueError(f"Unknown backend: {backend}")
+        if backend == 'auto':
+            backend = 'cuda' if HAS_CUPY and cp.cuda.is_available() else 'cpu'
+        elif backend == 'cuda' and not (HAS_CUPY and cp.cuda.is_available()):
+            raise RuntimeError("CUDA backend requested but CuPy or a GPU is unavailable")
+
         thermal_periods = np.linspace(thermal_range[0], thermal_range[1], resolution)
         tidal_periods = np.linspace(tidal_range[0], tidal_range[1], resolution)
 
-        sync_map = np.zeros((resolution, resolution))
+        # Every grid cell is a short default-parameter run; the thermal
+        # signal depends only on the row and the tidal one only on the
+        # column, so each is generated once per period as an (R, N) batch
+        probe = TTST(TTSTParameters(solar_period=self.params.solar_period))
+        probe._rng = self._rng  # noise follows this model's seed
+        t = np.arange(0, 50, 0.01)
+        thermal = probe.thermal_rhythm(t, thermal_periods[:, None])
+        tidal = probe.tidal_rhythm(t, tidal_periods[:, None])
 
-        for i, t_thermal in enumerate(thermal_periods):
-            for j, t_tidal in enumerate(tidal_periods):
-                # Create temporary parameters
-                temp_params = TTSTParameters(
-                    thermal_period=t_thermal,
-                    tidal_period=t_tidal,
-                    solar_period=self.params.solar_period
-                )
+        # The signals are generated on the host so both backends draw the
+        # same noise; the FFTs and the product below run on the device.
+        # NumPy functions dispatch to CuPy for device arrays.
+        fft = sp_fft
+        if backend == 'cuda':
+            thermal, tidal, fft = cp.asarray(thermal), cp.asarray(tidal), cp_fft
 
-                # Run short simulation
-                temp_sim = TTST(temp_params)
-                temp_sim.simulate(duration=50, dt=0.01)
+        # Unit phasors of the analytic signals, one batched FFT per family
+        with sp_fft.set_workers(-1):
+            thermal_phasor = np.exp(1j * np.angle(_analytic_signal(thermal, fft=fft)))
+            tidal_phasor = np.exp(1j * np.angle(_analytic_signal(tidal, fft=fft)))
 
-                # Calculate synchronization
-                sync_map[i, j] = temp_sim.calculate_synchronization()
+        # |mean_n exp(i*(theta_i - phi_j))| for all (i, j) as one product
+        sync_map = np.abs(thermal_phasor @ tidal_phasor.conj().T) / len(t)
 
-        return sync_map
+        return cp.asnumpy(sync_map) if backend == 'cuda' else sync_map
 
     def snowball_earth_modulation(self, t: np.ndarray) -> Dict[str, np.ndarray]:
         """Simulate rhythm disruption during Snowball Earth
@@ -260,55 +518,87 @@ class TTST:
             'combined': thermal_modulated + tidal_modulated + solar_modulated
         }
 
-    def plot_rhythms(self, duration: float = 48.0):
+    def plot_rhythms(self, duration: float = 48.0, refresh: bool = False):
         """Plot the three rhythms and combined signal
 
+        The figure is kept on the instance; later calls with the same
+        duration and solar period update its lines in place instead of
+        building a new figure.
+
         Args:
             duration: Duration to plot in hours
+            refresh: Build a new figure even if one is still open
         """
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import PolyCollection
+
         if self.time is None:
             self.simulate(duration=duration)
 
+        signals = [self.thermal, self.tidal, self.solar, self.combined_rhythm]
+
+        # Day/night shading depends on these, so they select the figure
+        key = (duration, self.params.solar_period)
+        fig = self._vis_fig
+        if (not refresh and fig is not None and key == self._vis_key
+                and plt.fignum_exists(fig.number)):
+            for line, y in zip(self._vis_lines, signals):
+                line.set_data(self.time, y)
+            for ax in fig.axes:
+                ax.relim()
+                ax.autoscale_view()
+            fig.canvas.draw_idle()
+            return fig
+
         fig, axes = plt.subplots(4, 1, figsize=(12, 10))
 
         # Thermal rhythm
-        axes[0].plot(self.time, self.thermal, 'r-', linewidth=1)
+        thermal_line, = axes[0].plot(self.time, self.thermal, 'r-', linewidth=1)
         axes[0].set_ylabel('Thermal')
         axes[0].set_title('Environmental Rhythms')
         axes[0].grid(True, alpha=0.3)
 
         # Tidal rhythm
-        axes[1].plot(self.time, self.tidal, 'b-', linewidth=1.5)
+        tidal_line, = axes[1].plot(self.time, self.tidal, 'b-', linewidth=1.5)
         axes[1].set_ylabel('Tidal')
         axes[1].grid(True, alpha=0.3)
 
         # Solar rhythm
-        axes[2].plot(self.time, self.solar, 'orange', linewidth=2)
+        solar_line, = axes[2].plot(self.time, self.solar, 'orange', linewidth=2)
         axes[2].set_ylabel('Solar')
         axes[2].grid(True, alpha=0.3)
 
-        # Add day/night shading
+        # Add day/night shading, one collection of full-height bands per
+        # colour and axis instead of two axvspan patches per day
+        period = self.params.solar_period
+        starts = period * np.arange(int(duration / period) + 1)
         for ax in axes[:3]:
-            for i in range(int(duration / self.params.solar_period) + 1):
-                start = i * self.params.solar_period
-                ax.axvspan(start, start + self.params.solar_period/2,
-                          alpha=0.1, color='yellow')
-                ax.axvspan(start + self.params.solar_period/2,
-                          start + self.params.solar_period,
-                          alpha=0.1, color='blue')
+            for offset, color in ((0.0, 'yellow'), (period / 2, 'blue')):
+                ax.add_collection(PolyCollection(
+                    _band_vertices(starts + offset, starts + offset + period / 2),
+                    transform=ax.get_xaxis_transform(), alpha=0.1, color=color
+                ), autolim=False)
+            ax.update_datalim([(starts[0], 0.0), (starts[-1] + period, 0.0)],
+                              updatey=False)
+            ax.autoscale_view()
 
         # Combined rhythm
-        axes[3].plot(self.time, self.combined_rhythm, 'k-', linewidth=1.5)
+        combined_line, = axes[3].plot(self.time, self.combined_rhythm, 'k-', linewidth=1.5)
         axes[3].set_ylabel('Combined')
         axes[3].set_xlabel('Time (hours)')
         axes[3].grid(True, alpha=0.3)
 
         plt.tight_layout()
+
+        self._vis_fig, self._vis_key = fig, key
+        self._vis_lines = [thermal_line, tidal_line, solar_line, combined_line]
         return fig
 
 
 def main():
     """Main function for testing"""
+    import matplotlib.pyplot as plt
+
     print("TTST - Tidal-Thermal Synchronization Theory")
     print("=" * 50)
 